@@ -1,28 +1,81 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import atexit
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+import hashlib
+import logging
+from logging.handlers import QueueHandler, QueueListener
 import os
 from pathlib import Path
-import uuid
+import queue
+import secrets
+import shutil
 from dotenv import load_dotenv
-import base64
 
 from services.imagen_service import generate_image_from_prompt, edit_image_with_prompt
 from services.text_overlay_service import add_text_to_image, preview_text_positions
 from services.text_generation_service import generate_hebrew_marketing_text
+from services.genai_client import close_client, warm_up_client
+from services.executors import run_cpu, run_io, shutdown_executors
+from services.fonts import discover_fonts
+from services.image_utils import EXTENSIONS, PILLOW_SIMD, detect_format, mime_type, sniff_image
 
 load_dotenv()
 
-app = FastAPI(title="Hebrew Image Generator")
+# Logging - records go through a queue so stdout writes happen on a background thread, not the event loop
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(levelname)s [%(name)s] %(message)s",
+    handlers=[QueueHandler(log_queue)]
+)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+logger = logging.getLogger("hebvoice")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup, then shutdown once the server stops taking requests"""
+    if PILLOW_SIMD:
+        logger.info("Image backend: Pillow-SIMD")
+    else:
+        logger.info("Image backend: stock Pillow (build with PILLOW_SIMD=1 for SIMD resize)")
+    
+    # Connect to Gemini in the background - startup doesn't wait for the network
+    app.state.gemini_warm_up = asyncio.create_task(warm_up_client())
+    
+    yield
+    
+    # In this order: the cache flush still needs the I/O pool, the client goes last
+    await persist_images(list(image_cache.items()))
+    shutdown_executors()
+    await close_client()
+
+
+app = FastAPI(title="Hebrew Image Generator", lifespan=lifespan)
+
+# Compress responses (pages, scripts, JSON).
+# Level 1 keeps the CPU cost negligible while still shrinking the payload.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
+
+# CORS - explicit lists instead of wildcards (the frontend only uses GET/POST with form data)
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",") if origin.strip()]
 
-# CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
 # Directories
@@ -31,26 +84,161 @@ OUTPUT_DIR = Path("outputs")
 UPLOAD_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# Recently generated images are kept in memory (LRU) and served from there by /api/image,
+# so they are only written to disk when evicted or on shutdown
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "200"))
+
+# Memory budget - images are several MB each, so a count limit alone can grow large
+IMAGE_CACHE_BYTES = int(os.getenv("IMAGE_CACHE_MB", "128")) * 1024 * 1024
+
+image_cache: OrderedDict[str, bytes] = OrderedDict()
+image_cache_bytes = 0
+
+
+def write_images(images: list[tuple[str, bytes]]) -> None:
+    for image_id, image_bytes in images:
+        (OUTPUT_DIR / f"{image_id}.png").write_bytes(image_bytes)
+
+
+async def persist_images(images: list[tuple[str, bytes]]) -> None:
+    """Write images to OUTPUT_DIR as one batch on the I/O pool"""
+    # Page-cache writes are short - one thread hop for the whole batch beats one per file
+    if images:
+        await run_io(write_images, images)
+
+
+async def cache_image(image_id: str, image_bytes: bytes) -> None:
+    """Keep an image in memory, spilling the least recently used ones to disk"""
+    global image_cache_bytes
+    previous = image_cache.pop(image_id, None)
+    if previous is not None:
+        image_cache_bytes -= len(previous)
+    image_cache[image_id] = image_bytes
+    image_cache_bytes += len(image_bytes)
+    
+    # Least recently used first, until both the count and the byte budget fit
+    evicted = []
+    count, size = len(image_cache), image_cache_bytes
+    for evicted_id, evicted_bytes in image_cache.items():
+        if count <= IMAGE_CACHE_SIZE and size <= IMAGE_CACHE_BYTES:
+            break
+        evicted.append((evicted_id, evicted_bytes))
+        count -= 1
+        size -= len(evicted_bytes)
+    
+    if evicted:
+        # Write before dropping, so evicted images stay readable from memory meanwhile
+        await persist_images(evicted)
+        for evicted_id, evicted_bytes in evicted:
+            # Keep an image stored under the same id while the write was in flight (re-rendered text)
+            if image_cache.get(evicted_id) is evicted_bytes:
+                del image_cache[evicted_id]
+                image_cache_bytes -= len(evicted_bytes)
+
+
+async def load_image(image_id: str) -> bytes | None:
+    """Get image bytes from the in-memory cache, falling back to disk"""
+    image_bytes = image_cache.get(image_id)
+    if image_bytes is not None:
+        image_cache.move_to_end(image_id)
+        return image_bytes
+    
+    image_path = OUTPUT_DIR / f"{image_id}.png"
+    if not image_path.exists():
+        return None
+    return await run_io(image_path.read_bytes)
+
+
+def read_header(path: Path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(12)
+
+
+async def image_response(image_id: str, filename_stem: str) -> Response:
+    """Serve an image from the in-memory cache or from disk
+    
+    Images keep the format they were generated in (the API may return JPEG), so the
+    media type and file extension come from the magic bytes, not the .png on disk.
+    """
+    image_bytes = image_cache.get(image_id)
+    image_path = OUTPUT_DIR / f"{image_id}.png"
+    header = image_bytes[:12] if image_bytes is not None else await run_io(read_header, image_path)
+    image_format = detect_format(header) or "PNG"
+    filename = f"{filename_stem}.{EXTENSIONS[image_format]}"
+    
+    if image_bytes is not None:
+        return Response(
+            image_bytes,
+            media_type=mime_type(image_format),
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    
+    return FileResponse(image_path, media_type=mime_type(image_format), filename=filename)
+
+
+def image_exists(image_id: str) -> bool:
+    return image_id in image_cache or (OUTPUT_DIR / f"{image_id}.png").exists()
+
+
 # Serve frontend
-from pathlib import Path
 frontend_dir = Path(__file__).parent.parent / "frontend"
 app.mount("/static", StaticFiles(directory=str(frontend_dir)), name="static")
 
+# HTML pages are small and static - read them once instead of stat+open on every hit
+def load_page(name: str) -> tuple[bytes, str]:
+    body = (frontend_dir / name).read_bytes()
+    return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+PAGES = {name: load_page(name) for name in ("landing.html", "app.html")}
+
+def html_response(request: Request, name: str) -> Response:
+    """Serve a cached HTML page, answering 304 when the client already has it"""
+    body, etag = PAGES[name]
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="text/html", headers=headers)
+
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Landing page"""
-    return FileResponse(str(frontend_dir / "landing.html"))
+    return html_response(request, "landing.html")
 
 @app.get("/app")
-async def app_page():
+async def app_page(request: Request):
     """Main application"""
-    return FileResponse(str(frontend_dir / "app.html"))
+    return html_response(request, "app.html")
+
+async def save_generated_image(image_id: str, image_bytes: bytes) -> dict:
+    """Cache a generated image and build its API entry"""
+    # The frontend loads the image from image_url - no base64 copy in the JSON
+    await cache_image(image_id, image_bytes)
+    _, width, height = sniff_image(image_bytes)
+    
+    return {
+        "image_id": image_id,
+        "image_url": f"/api/image/{image_id}",
+        "width": width,
+        "height": height
+    }
+
+
+# Enough to hold the size fields of PNG/GIF/WebP and of JPEGs with typical EXIF blocks
+UPLOAD_HEADER_BYTES = 64 * 1024
+
+
+def copy_upload(source, destination: Path) -> None:
+    """Stream an uploaded file to disk in 1 MiB chunks"""
+    source.seek(0)
+    with open(destination, "wb") as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
 
 @app.post("/api/generate-image")
 async def generate_image(
     prompt: str = Form(default=""),
     aspect_ratio: str = Form(default="16:9"),
     num_images: int = Form(default=4),
+    regenerate: bool = Form(default=False),
     image: UploadFile = File(None)
 ):
     """Generate image(s) using Imagen (Nano Banana) - Always generates 4 images"""
@@ -68,74 +256,76 @@ async def generate_image(
         
         # Generate image
         if image and image.filename:
-            # User uploaded image - read bytes directly
+            # User uploaded image - validate from the header, only load it whole when editing
             try:
                 # Reset file pointer to beginning
                 await image.seek(0)
-                uploaded_image_bytes = await image.read()
+                header = await run_io(image.file.read, UPLOAD_HEADER_BYTES)
                 
-                print(f"[DEBUG] Uploaded image bytes size: {len(uploaded_image_bytes)}")
-                print(f"[DEBUG] Image filename: {image.filename}")
-                print(f"[DEBUG] Image content_type: {image.content_type}")
+                logger.debug(
+                    "Uploaded image: %s bytes, filename=%s, content_type=%s",
+                    image.size, image.filename, image.content_type
+                )
                 
-                if len(uploaded_image_bytes) == 0:
+                if len(header) == 0:
                     raise HTTPException(status_code=400, detail="Uploaded image is empty")
                 
-                # Validate it's actually an image
-                from PIL import Image as PILImageValidation
-                import io as io_validation
+                # Validate it's actually an image (header sniff - no PIL decode)
                 try:
-                    test_img = PILImageValidation.open(io_validation.BytesIO(uploaded_image_bytes))
-                    print(f"[DEBUG] Image validated: {test_img.size}, mode: {test_img.mode}")
-                except Exception as e:
+                    try:
+                        image_format, width, height = sniff_image(header)
+                    except ValueError:
+                        if len(header) < UPLOAD_HEADER_BYTES:
+                            raise
+                        # Metadata-heavy JPEG - the size marker is past the first chunk
+                        await image.seek(0)
+                        image_format, width, height = sniff_image(await run_io(image.file.read))
+                    logger.debug("Image validated: %dx%d, format: %s", width, height, image_format)
+                except ValueError as e:
                     raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
                 
                 if prompt and prompt.strip():
-                    # Edit the uploaded image based on prompt
-                    print(f"[DEBUG] Editing image with prompt: {prompt[:50]}...")
-                    image_list = await edit_image_with_prompt(uploaded_image_bytes, prompt, aspect_ratio, num_images)
+                    # Edit the uploaded image based on prompt - the SDK needs the whole image
+                    logger.debug("Editing image with prompt: %.50s...", prompt)
+                    await image.seek(0)
+                    uploaded_image_bytes = await run_io(image.file.read)
+                    image_list = await edit_image_with_prompt(
+                        uploaded_image_bytes, prompt, aspect_ratio, num_images, use_cache=not regenerate
+                    )
                 else:
-                    # No prompt - use uploaded image as-is
-                    print(f"[DEBUG] Using uploaded image as-is (no prompt)")
-                    image_list = [uploaded_image_bytes]
+                    # No prompt - use uploaded image as-is: stream the spooled file straight to
+                    # OUTPUT_DIR instead of holding it in memory
+                    logger.debug("Using uploaded image as-is (no prompt)")
+                    image_id = f"{secrets.token_hex(4)}_0"
+                    await run_io(copy_upload, image.file, OUTPUT_DIR / f"{image_id}.png")
+                    return {
+                        "success": True,
+                        "images": [{
+                            "image_id": image_id,
+                            "image_url": f"/api/image/{image_id}",
+                            "width": width,
+                            "height": height
+                        }],
+                        "count": 1
+                    }
             except HTTPException:
                 raise
             except Exception as e:
-                import traceback
-                print(f"[ERROR] Failed to process uploaded image: {str(e)}\n{traceback.format_exc()}")
+                logger.exception("Failed to process uploaded image")
                 raise HTTPException(status_code=400, detail=f"Failed to process uploaded image: {str(e)}")
         else:
             # No image uploaded - generate new image from prompt
             if not prompt or not prompt.strip():
                 raise HTTPException(status_code=400, detail="Either image or prompt is required")
             
-            image_list = await generate_image_from_prompt(prompt, aspect_ratio, num_images)
+            image_list = await generate_image_from_prompt(prompt, aspect_ratio, num_images, use_cache=not regenerate)
         
-        # Save all generated images
-        generated_images = []
-        for idx, image_bytes in enumerate(image_list):
-            image_id = f"{str(uuid.uuid4())[:8]}_{idx}"
-            output_path = OUTPUT_DIR / f"{image_id}.png"
-            
-            with open(output_path, "wb") as f:
-                f.write(image_bytes)
-            
-            # Get image dimensions
-            from PIL import Image
-            import io
-            img = Image.open(io.BytesIO(image_bytes))
-            width, height = img.size
-            
-            # Return image as base64 for preview
-            image_base64 = base64.b64encode(image_bytes).decode()
-            
-            generated_images.append({
-                "image_id": image_id,
-                "image_url": f"/api/image/{image_id}",
-                "image_base64": f"data:image/png;base64,{image_base64}",
-                "width": width,
-                "height": height
-            })
+        # Save + encode all generated images concurrently (one random prefix per request)
+        request_prefix = secrets.token_hex(4)
+        generated_images = await asyncio.gather(*[
+            save_generated_image(f"{request_prefix}_{idx}", image_bytes)
+            for idx, image_bytes in enumerate(image_list)
+        ])
         
         return {
             "success": True,
@@ -144,9 +334,7 @@ async def generate_image(
         }
         
     except Exception as e:
-        import traceback
-        error_detail = f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-        print(f"ERROR: {error_detail}")
+        logger.exception("/api/generate-image failed")
         
         # User-friendly error messages
         error_msg = str(e)
@@ -164,13 +352,10 @@ async def suggest_texts(
     """Generate marketing text suggestions based on image analysis"""
     try:
         # Load image
-        image_path = OUTPUT_DIR / f"{image_id}.png"
-        if not image_path.exists():
+        image_bytes = await load_image(image_id)
+        if image_bytes is None:
             raise HTTPException(status_code=404, detail="Image not found")
         
-        with open(image_path, "rb") as f:
-            image_bytes = f.read()
-        
         # Generate text suggestions using Gemini vision
         texts = await generate_hebrew_marketing_text(image_bytes, product_description, language=language)
         
@@ -180,9 +365,7 @@ async def suggest_texts(
         }
         
     except Exception as e:
-        import traceback
-        error_detail = f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-        print(f"ERROR: {error_detail}")
+        logger.exception("/api/suggest-texts failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/preview-text-positions")
@@ -193,16 +376,15 @@ async def get_text_positions(
 ):
     """Get suggested text positions for an image"""
     try:
-        # Load image
-        image_path = OUTPUT_DIR / f"{image_id}.png"
-        if not image_path.exists():
-            raise HTTPException(status_code=404, detail="Image not found")
-        
-        with open(image_path, "rb") as f:
-            image_bytes = f.read()
+        # Load image - cached bytes, or the file path so PIL reads only the header
+        image_source = image_cache.get(image_id)
+        if image_source is None:
+            image_source = OUTPUT_DIR / f"{image_id}.png"
+            if not image_source.exists():
+                raise HTTPException(status_code=404, detail="Image not found")
         
         # Get position suggestions
-        positions = preview_text_positions(image_bytes, text, font_size)
+        positions = preview_text_positions(image_source, text, font_size)
         
         return {
             "success": True,
@@ -210,11 +392,14 @@ async def get_text_positions(
         }
         
     except Exception as e:
-        import traceback
-        error_detail = f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-        print(f"ERROR: {error_detail}")
+        logger.exception("/api/preview-text-positions failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+@lru_cache(maxsize=256)
+def parse_rgba(color: str) -> tuple[int, ...]:
+    """Parse "R,G,B,A" - cached, the frontend only sends a handful of distinct colors"""
+    return tuple(int(c) for c in color.split(','))
+
 @app.post("/api/add-text")
 async def add_text_endpoint(
     image_id: str = Form(...),
@@ -233,43 +418,36 @@ async def add_text_endpoint(
     """Add Hebrew text to generated image"""
     try:
         # Load original image
-        image_path = OUTPUT_DIR / f"{image_id}.png"
-        if not image_path.exists():
+        image_bytes = await load_image(image_id)
+        if image_bytes is None:
             raise HTTPException(status_code=404, detail="Image not found")
         
-        with open(image_path, "rb") as f:
-            image_bytes = f.read()
-        
         # Parse color strings (R,G,B,A)
         try:
-            font_rgba = tuple(int(c) for c in font_color.split(','))
-            stroke_rgba = tuple(int(c) for c in stroke_color.split(',')) if stroke_color else None
-        except:
+            font_rgba = parse_rgba(font_color)
+            stroke_rgba = parse_rgba(stroke_color) if stroke_color else None
+        except ValueError:
             font_rgba = (255, 255, 255, 255)
             stroke_rgba = (0, 0, 0, 255)
         
-        # Check actual image size
-        from PIL import Image as PILImage
-        import io
-        img_check = PILImage.open(io.BytesIO(image_bytes))
-        actual_width, actual_height = img_check.size
+        # Check actual image size (read from the header, no decode)
+        _, actual_width, actual_height = sniff_image(image_bytes)
         
-        print(f"[Text Overlay] ========== DEBUG ==========")
-        print(f"[Text Overlay] Canvas (from frontend): {canvas_width}x{canvas_height}")
-        print(f"[Text Overlay] Image (actual file): {actual_width}x{actual_height}")
-        print(f"[Text Overlay] Font size: {font_size}px")
-        print(f"[Text Overlay] Position from frontend: ({x}, {y})")
-        print(f"[Text Overlay] Stroke width: {stroke_width}px")
-        print(f"[Text Overlay] Text: '{text}'")
-        print(f"[Text Overlay] Font family: {font_family}")
+        logger.debug(
+            "Add text: canvas %dx%d, image %dx%d, font %s %dpx, stroke %dpx, position (%d, %d), text %r",
+            canvas_width, canvas_height, actual_width, actual_height,
+            font_family, font_size, stroke_width, x, y, text
+        )
         
         # Canvas должен быть равен изображению - масштабирование НЕ нужно!
         # Если размеры не совпадают - это ошибка
         if canvas_width > 0 and abs(canvas_width - actual_width) > 10:
-            print(f"[WARNING] Canvas size mismatch! This should not happen.")
+            logger.warning("Canvas size mismatch (%d vs %d)! This should not happen.", canvas_width, actual_width)
         
-        # Add text overlay
-        result_bytes = add_text_to_image(
+        # Add text overlay - decode/composite/encode runs on the CPU pool, not the event loop
+        # (Pillow releases the GIL for the heavy parts, so threads run in parallel)
+        result_bytes = await run_cpu(partial(
+            add_text_to_image,
             image_bytes=image_bytes,
             text=text,
             position=(x, y),
@@ -279,63 +457,41 @@ async def add_text_endpoint(
             stroke_color=stroke_rgba,
             stroke_width=stroke_width,
             bold=bold
-        )
+        ))
         
         # Save result with new ID
         result_id = f"{image_id}_text"
-        result_path = OUTPUT_DIR / f"{result_id}.png"
-        with open(result_path, "wb") as f:
-            f.write(result_bytes)
-        
-        # Return as base64
-        result_base64 = base64.b64encode(result_bytes).decode()
+        await cache_image(result_id, result_bytes)
         
         return {
             "success": True,
             "image_id": result_id,
-            "image_url": f"/api/image/{result_id}",
-            "image_base64": f"data:image/png;base64,{result_base64}"
+            "image_url": f"/api/image/{result_id}"
         }
         
     except Exception as e:
-        import traceback
-        error_detail = f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-        print(f"ERROR: {error_detail}")
+        logger.exception("/api/add-text failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/image/{image_id}")
 async def get_image(image_id: str):
     """Get generated image"""
-    image_path = OUTPUT_DIR / f"{image_id}.png"
-    
-    if not image_path.exists():
+    if not image_exists(image_id):
         raise HTTPException(status_code=404, detail="Image not found")
     
-    return FileResponse(
-        image_path,
-        media_type="image/png",
-        filename=f"image_{image_id}.png"
-    )
+    return await image_response(image_id, f"image_{image_id}")
 
 @app.get("/api/download/{image_id}")
 async def download_image(image_id: str):
     """Download final image"""
-    # Try final version first
-    image_path = OUTPUT_DIR / f"{image_id}_final.png"
+    # Try final version first, fallback to original
+    final_id = f"{image_id}_final"
+    source_id = final_id if image_exists(final_id) else image_id
     
-    if not image_path.exists():
-        # Fallback to original
-        image_path = OUTPUT_DIR / f"{image_id}.png"
-    
-    if not image_path.exists():
+    if not image_exists(source_id):
         raise HTTPException(status_code=404, detail="Image not found")
     
-    return FileResponse(
-        image_path,
-        media_type="image/png",
-        filename=f"product_image_{image_id}.png",
-        headers={"Content-Disposition": f"attachment; filename=product_image_{image_id}.png"}
-    )
+    return await image_response(source_id, f"product_image_{image_id}")
 
 @app.get("/health")
 async def health():
@@ -344,30 +500,22 @@ async def health():
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    print(f"Starting server on port {port}...")
-    print(f"GOOGLE_API_KEY configured: {'Yes' if os.getenv('GOOGLE_API_KEY') else 'No'}")
+    logger.info("Starting server on port %d...", port)
+    logger.info("GOOGLE_API_KEY configured: %s", "Yes" if os.getenv("GOOGLE_API_KEY") else "No")
     
-    # List available fonts at startup
-    import glob
-    font_dirs = [
-        "/usr/share/fonts/truetype/**/*.ttf",
-        "/nix/store/*/share/fonts/**/*.ttf",
-        "C:\\Windows\\Fonts\\*.ttf"
-    ]
-    print("\n[Font Check] Searching for available fonts...")
-    found_fonts = []
-    for pattern in font_dirs:
-        found_fonts.extend(glob.glob(pattern, recursive=True))
+    # List available fonts at startup (cached - text overlay reuses the same scan)
+    found_fonts = discover_fonts()
     
     if found_fonts:
-        print(f"[Font Check] Found {len(found_fonts)} fonts:")
-        for font in found_fonts[:10]:  # Show first 10
-            print(f"  - {font}")
-        if len(found_fonts) > 10:
-            print(f"  ... and {len(found_fonts) - 10} more")
+        # Show first 10
+        logger.info(
+            "Font check: found %d fonts:\n%s%s",
+            len(found_fonts),
+            "\n".join(f"  - {font}" for font in found_fonts[:10]),
+            f"\n  ... and {len(found_fonts) - 10} more" if len(found_fonts) > 10 else ""
+        )
     else:
-        print("[Font Check] WARNING: No fonts found! Text overlay will use tiny default font.")
-    print()
+        logger.warning("Font check: no fonts found! Text overlay will use tiny default font.")
     
     uvicorn.run(app, host="0.0.0.0", port=port)
 
@@ -0,0 +1,29 @@
+"""
+Worker pools shared by the endpoints and services for work that would block the event loop
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+# CPU-bound image work (PIL decode/resize/encode) gets one thread per core (more would just
+# fight over the cores), disk I/O gets a wider pool so slow writes don't queue behind encoding
+CPU_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="img-cpu")
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="img-io")
+
+
+async def run_cpu(func, *args):
+    """Run CPU-bound work (PIL) on the CPU pool"""
+    return await asyncio.get_running_loop().run_in_executor(CPU_EXECUTOR, func, *args)
+
+
+async def run_io(func, *args):
+    """Run blocking file I/O on the I/O pool"""
+    return await asyncio.get_running_loop().run_in_executor(IO_EXECUTOR, func, *args)
+
+
+def shutdown_executors() -> None:
+    """Stop both pools, waiting for queued work (e.g. the image cache flush) to finish"""
+    CPU_EXECUTOR.shutdown(wait=True)
+    IO_EXECUTOR.shutdown(wait=True)
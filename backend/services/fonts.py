@@ -0,0 +1,69 @@
+"""
+Font discovery shared by the startup font check and the text overlay service
+"""
+
+import os
+from functools import lru_cache
+
+
+FONT_EXTENSIONS = (".ttf", ".otf")
+
+# Directories scanned recursively for font files
+FONT_DIRS = [
+    # Linux fonts (Railway uses Linux)
+    "/usr/share/fonts",
+    # Windows fonts (for local dev)
+    "C:\\Windows\\Fonts",
+    # macOS fonts
+    "/System/Library/Fonts",
+    "/Library/Fonts",
+]
+
+# Nix keeps fonts under /nix/store/<package>/share/fonts
+NIX_STORE = "/nix/store"
+
+
+def _font_roots() -> list[str]:
+    roots = list(FONT_DIRS)
+
+    # Only look at share/fonts of each Nix package instead of walking the whole store
+    try:
+        with os.scandir(NIX_STORE) as entries:
+            for entry in entries:
+                fonts_dir = os.path.join(entry.path, "share", "fonts")
+                if os.path.isdir(fonts_dir):
+                    roots.append(fonts_dir)
+    except OSError:
+        pass
+
+    return roots
+
+
+def _walk_fonts(path: str, found: list[str]) -> None:
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    _walk_fonts(entry.path, found)
+                elif entry.name.lower().endswith(FONT_EXTENSIONS):
+                    found.append(entry.path)
+    except OSError:
+        pass
+
+
+@lru_cache(maxsize=1)
+def discover_fonts() -> tuple[str, ...]:
+    """Find all installed TrueType/OpenType fonts (scanned once per process)"""
+    found = []
+    for root in _font_roots():
+        _walk_fonts(root, found)
+    return tuple(found)
+
+
+@lru_cache(maxsize=1)
+def fonts_by_name() -> dict[str, str]:
+    """Map lowercase font file name (e.g. "dejavusans-bold.ttf") to its path"""
+    fonts = {}
+    for path in discover_fonts():
+        fonts.setdefault(os.path.basename(path).lower(), path)
+    return fonts
@@ -0,0 +1,64 @@
+"""
+Shared Google GenAI client - one connection pool for image generation and text suggestions
+"""
+
+import logging
+import os
+
+import httpx
+from google import genai
+from google.genai import types
+
+try:
+    # HTTP/2 lets concurrent calls share one connection instead of one TLS session each
+    import h2  # noqa: F401
+    GEMINI_HTTP2 = True
+except ImportError:
+    GEMINI_HTTP2 = False
+
+logger = logging.getLogger(__name__)
+
+# Initialize Google AI Studio API
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# Max calls in flight across all requests - more just trips the API rate limit
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "5"))
+
+# One pooled transport for the process: keep-alive connections (sized to the concurrency
+# limit) are reused across calls instead of paying TCP/TLS setup per request
+GEMINI_LIMITS = httpx.Limits(
+    max_connections=GEMINI_CONCURRENCY * 2,
+    max_keepalive_connections=GEMINI_CONCURRENCY,
+    keepalive_expiry=300
+)
+GEMINI_HTTP_OPTIONS = types.HttpOptions(
+    client_args={"limits": GEMINI_LIMITS},
+    # client.aio - an explicit httpx transport also keeps the SDK from switching to aiohttp
+    async_client_args={"transport": httpx.AsyncHTTPTransport(limits=GEMINI_LIMITS, http2=GEMINI_HTTP2)}
+)
+
+# Configuration is reported by warm_up_client() at startup, once logging is set up
+client = genai.Client(api_key=GOOGLE_API_KEY, http_options=GEMINI_HTTP_OPTIONS) if GOOGLE_API_KEY else None
+
+
+async def warm_up_client() -> None:
+    """Open a pooled connection with one cheap call, so the first user request skips the TCP/TLS handshake"""
+    if not client:
+        logger.warning("GOOGLE_API_KEY not set in environment")
+        return
+    logger.info(
+        "Google AI Studio API configured (SDK version: %s, HTTP/2: %s)",
+        getattr(genai, "__version__", "unknown"), GEMINI_HTTP2
+    )
+    try:
+        await client.aio.models.list(config={"page_size": 1})
+        logger.info("Gemini connection warmed up")
+    except Exception as e:
+        logger.warning("Gemini warm-up failed: %s", e)
+
+
+async def close_client() -> None:
+    """Close the pooled HTTP connections (called on app shutdown)"""
+    if client:
+        await client.aio.aclose()
+        client.close()
@@ -0,0 +1,227 @@
+"""
+LRU of Gemini image results, so repeated prompts skip the API call
+
+In memory, optionally backed by a directory (GENERATION_CACHE_DIR) that survives restarts
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import struct
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from services.executors import IO_EXECUTOR, run_io
+
+try:
+    # SIMD/multi-threaded - hashes a multi-MB upload several times faster than hashlib
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "64"))
+
+# Memory budget - entries hold several multi-MB images, so a count limit alone can grow large
+GENERATION_CACHE_BYTES = int(os.getenv("GENERATION_CACHE_MB", "256")) * 1024 * 1024
+
+# Seconds a result is reused - after that the same request generates fresh images
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", "3600"))
+
+# On-disk copy of results (empty = memory only), bounded to GENERATION_CACHE_DISK_MB
+GENERATION_CACHE_DIR = os.getenv("GENERATION_CACHE_DIR", "")
+GENERATION_CACHE_DISK_BYTES = int(os.getenv("GENERATION_CACHE_DISK_MB", "1024")) * 1024 * 1024
+
+# key -> (expiry time on the monotonic clock, images)
+_cache: OrderedDict[str, tuple[float, list[bytes]]] = OrderedDict()
+_cache_bytes = 0
+
+# Generations currently running, so identical concurrent requests share one API call
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def cache_key(
+    model: str,
+    prompt: str,
+    aspect_ratio: str,
+    num_images: int,
+    image_bytes: Optional[bytes] = None
+) -> str:
+    """Hash the model, request parameters (and the input image for edits) into a cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{model}|{normalize_prompt(prompt)}|{aspect_ratio}|{num_images}|".encode())
+    if image_bytes:
+        digest.update(_hash_image(image_bytes))
+    return digest.hexdigest()
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Whitespace doesn't change what gets generated - "a  cat " and "a cat" share a key
+    
+    Case does: quoted text is rendered as written, so "SALE" and "sale" stay distinct.
+    """
+    return " ".join(prompt.split())
+
+
+def _hash_image(image_bytes: bytes) -> bytes:
+    if blake3 is not None:
+        return blake3(image_bytes).digest(length=16)
+    return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+
+def get_cached(key: str) -> Optional[list[bytes]]:
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    expires, images = entry
+    if expires <= time.monotonic():
+        _evict(key)
+        return None
+    _cache.move_to_end(key)
+    return list(images)
+
+
+def _evict(key: str) -> None:
+    global _cache_bytes
+    _, images = _cache.pop(key)
+    _cache_bytes -= sum(map(len, images))
+
+
+def store(key: str, images: list[bytes], ttl: Optional[float] = None) -> None:
+    """Cache images for ttl seconds - GENERATION_CACHE_TTL unless the result is already aging"""
+    global _cache_bytes
+    if ttl is None:
+        ttl = GENERATION_CACHE_TTL
+    size = sum(map(len, images))
+    if GENERATION_CACHE_SIZE <= 0 or ttl <= 0 or size > GENERATION_CACHE_BYTES:
+        return
+    if key in _cache:
+        _evict(key)
+    _cache[key] = (time.monotonic() + ttl, list(images))
+    _cache_bytes += size
+    # Drop least recently used entries until both the count and the byte budget fit
+    while len(_cache) > GENERATION_CACHE_SIZE or _cache_bytes > GENERATION_CACHE_BYTES:
+        _evict(next(iter(_cache)))
+
+
+def _disk_path(key: str) -> Path:
+    return Path(GENERATION_CACHE_DIR) / f"{key}.bin"
+
+
+def _disk_load(key: str) -> Optional[tuple[float, list[bytes]]]:
+    """Read a result from the disk cache as (seconds of TTL left, images)
+    
+    None if missing or older than the TTL.
+    """
+    path = _disk_path(key)
+    try:
+        data = memoryview(path.read_bytes())
+    except OSError:
+        return None
+    
+    # creation time, count, then (length, bytes) per image
+    try:
+        created, count = struct.unpack_from(">dI", data)
+        # Expiry counts from creation - the mtime is only the LRU clock, reads touch it
+        remaining = created + GENERATION_CACHE_TTL - time.time()
+        if remaining <= 0:
+            path.unlink(missing_ok=True)
+            return None
+        images = []
+        offset = 12
+        for _ in range(count):
+            (length,) = struct.unpack_from(">I", data, offset)
+            offset += 4
+            images.append(bytes(data[offset:offset + length]))
+            offset += length
+        # Touch - eviction drops the least recently used files first
+        os.utime(path)
+    except struct.error:
+        logger.warning("Corrupt disk cache entry %s, ignoring", path.name)
+        return None
+    except OSError:
+        return None
+    return remaining, images
+
+
+def _disk_store(key: str, images: list[bytes]) -> None:
+    """Write a result to the disk cache, then evict the oldest files over the size budget"""
+    path = _disk_path(key)
+    temp_path = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, "wb") as f:
+            f.write(struct.pack(">dI", time.time(), len(images)))
+            for image in images:
+                f.write(struct.pack(">I", len(image)))
+                f.write(image)
+        # Atomic - readers never see a half-written entry
+        os.replace(temp_path, path)
+        
+        with os.scandir(path.parent) as entries:
+            files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                     for entry in entries if entry.name.endswith(".bin")]
+        total = sum(size for _, size, _ in files)
+        for _, size, file_path in sorted(files):
+            if total <= GENERATION_CACHE_DISK_BYTES:
+                break
+            os.unlink(file_path)
+            total -= size
+    except OSError as e:
+        logger.warning("Could not write disk cache entry: %s", e)
+
+
+async def _generate_and_store(
+    key: str,
+    generate: Callable[[], Awaitable[list[bytes]]],
+    num_images: int
+) -> list[bytes]:
+    if GENERATION_CACHE_DIR:
+        entry = await run_io(_disk_load, key)
+        if entry is not None:
+            remaining, images = entry
+            logger.info("Disk cache hit - returning %d cached image(s)", len(images))
+            # Only for the rest of its TTL - a disk hit doesn't make the result fresh again
+            store(key, images, remaining)
+            return images
+    
+    images = await generate()
+    if len(images) < num_images:
+        # Some images were blocked or failed - a retry may get them all, so don't pin this
+        logger.info("Got %d of %d image(s) - not caching", len(images), num_images)
+        return images
+    store(key, images)
+    if GENERATION_CACHE_DIR and GENERATION_CACHE_TTL > 0:
+        # Written in the background - the response doesn't wait for the disk
+        asyncio.get_running_loop().run_in_executor(IO_EXECUTOR, _disk_store, key, images)
+    return images
+
+
+async def get_or_generate(
+    key: str,
+    generate: Callable[[], Awaitable[list[bytes]]],
+    num_images: int
+) -> list[bytes]:
+    """Return cached images for key, or run generate() once for all concurrent callers of the same key
+    
+    Only a complete result (num_images images) is cached.
+    """
+    images = get_cached(key)
+    if images is not None:
+        logger.info("Cache hit - returning %d cached image(s)", len(images))
+        return images
+    
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_generate_and_store(key, generate, num_images))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        logger.info("Same request already in flight - waiting for its result")
+    
+    # shield - one caller going away must not cancel the generation the others wait on
+    return list(await asyncio.shield(task))
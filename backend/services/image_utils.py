@@ -0,0 +1,168 @@
+"""
+Lightweight image helpers that work on encoded bytes without decoding pixels
+"""
+
+import io
+import logging
+import struct
+
+import PIL
+from PIL import Image as PILImage
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Pillow-SIMD releases are versioned "<version>.postN" (see the PILLOW_SIMD Docker build arg)
+PILLOW_SIMD = ".post" in PIL.__version__
+
+# MIME types of the formats parsed directly from headers (others come from PIL's registry)
+MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+
+# File extensions for downloads, per format
+EXTENSIONS = {
+    "PNG": "png",
+    "JPEG": "jpg",
+    "WEBP": "webp",
+    "GIF": "gif",
+}
+
+# JPEG start-of-frame markers (SOF0-SOF15 except DHT, JPG and DAC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(data: memoryview) -> tuple[int, int]:
+    # Walk the marker segments until the first SOF, which holds height/width
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            raise ValueError("Corrupt JPEG marker stream")
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            # Standalone markers carry no length
+            i += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        (segment_length,) = struct.unpack(">H", data[i + 2:i + 4])
+        i += 2 + segment_length
+    raise ValueError("JPEG size not found")
+
+
+def _webp_size(data: memoryview) -> tuple[int, int]:
+    chunk = data[12:16]
+    if chunk == b"VP8X" and len(data) >= 30:
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    if chunk == b"VP8 " and len(data) >= 30 and data[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25 and data[20] == 0x2F:
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    raise ValueError("Unsupported WebP chunk")
+
+
+def sniff_image(data: bytes | memoryview) -> tuple[str, int, int]:
+    """Detect image format and (width, height) from the file header
+
+    PNG, JPEG, WebP and GIF are parsed directly from their headers; anything
+    else falls back to PIL, which also reads only the header on open.
+
+    Returns:
+        (format, width, height) - format uses PIL names ("PNG", "JPEG", ...)
+
+    Raises:
+        ValueError: data is not a recognizable image
+    """
+    # All slicing below goes through one memoryview - no byte copies of the input
+    view = memoryview(data)
+    header = view[:32]
+
+    try:
+        if header[:8] == PNG_SIGNATURE and header[12:16] == b"IHDR":
+            width, height = struct.unpack(">II", header[16:24])
+            return "PNG", width, height
+        if header[:3] == b"\xff\xd8\xff":
+            return ("JPEG", *_jpeg_size(view))
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return ("WEBP", *_webp_size(view))
+        if header[:6] in (b"GIF87a", b"GIF89a") and len(header) >= 10:
+            width, height = struct.unpack("<HH", header[6:10])
+            return "GIF", width, height
+    except struct.error as e:
+        raise ValueError(f"Truncated image header: {e}") from e
+
+    # Less common formats (BMP, TIFF, ...) - PIL parses only the header here
+    try:
+        with PILImage.open(io.BytesIO(view)) as img:
+            return img.format, img.width, img.height
+    except Exception as e:
+        raise ValueError(str(e)) from e
+
+
+def detect_format(header: bytes) -> str | None:
+    """Format name from the magic bytes of the first 12 bytes (None if not PNG/JPEG/WebP/GIF)"""
+    if header[:8] == PNG_SIGNATURE:
+        return "PNG"
+    if header[:3] == b"\xff\xd8\xff":
+        return "JPEG"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    return None
+
+
+def mime_type(image_format: str) -> str:
+    """MIME type for a format name returned by sniff_image (e.g. JPEG -> image/jpeg)"""
+    return MIME_TYPES.get(image_format) or PILImage.MIME.get(image_format, "application/octet-stream")
+
+
+def downscale_image(image_bytes: bytes, max_edge: int) -> tuple[bytes, str]:
+    """Shrink an image to fit max_edge x max_edge for upload to a model
+
+    Images already within max_edge are returned as-is. Larger ones are
+    re-encoded as JPEG q90 (PNG if they have transparency).
+
+    Returns:
+        (bytes, MIME type) to send
+
+    Raises:
+        ValueError: data is not a recognizable image
+    """
+    image_format, width, height = sniff_image(image_bytes)
+    if max(width, height) <= max_edge:
+        return image_bytes, mime_type(image_format)
+
+    with PILImage.open(io.BytesIO(image_bytes)) as source:
+        source.thumbnail((max_edge, max_edge), PILImage.LANCZOS, reducing_gap=3.0)
+        pil_img = source
+
+        buffer = io.BytesIO()
+        if pil_img.mode in ("RGBA", "LA", "PA") or "transparency" in pil_img.info:
+            # Keep the alpha channel - JPEG would flatten it
+            pil_img.save(buffer, format="PNG", compress_level=1)
+            sent_mime_type = "image/png"
+        else:
+            if pil_img.mode not in ("RGB", "L"):
+                pil_img = pil_img.convert("RGB")
+            pil_img.save(buffer, format="JPEG", quality=90)
+            sent_mime_type = "image/jpeg"
+
+        logger.info(
+            "Downscaled image %dx%d (%d bytes) -> %dx%d (%d bytes)",
+            width, height, len(image_bytes), *pil_img.size, buffer.tell()
+        )
+        return buffer.getvalue(), sent_mime_type
@@ -1,27 +1,98 @@
-from google import genai
-from google.genai import types
-import os
+from google.genai import errors, types
+import asyncio
+from functools import partial
+import logging
 import io
-from typing import Literal
+import os
+import random
+from typing import AsyncIterator, Literal, Optional
 from PIL import Image as PILImage
 
-# Initialize Google AI Studio API
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+from services import generation_cache
+from services.executors import run_cpu
+from services.genai_client import GEMINI_CONCURRENCY, GOOGLE_API_KEY, client
+from services.image_utils import downscale_image, sniff_image
 
-if GOOGLE_API_KEY:
-    client = genai.Client(api_key=GOOGLE_API_KEY)
-    try:
-        import google.genai as genai_module
-        sdk_version = getattr(genai_module, '__version__', 'unknown')
-        print(f"[Google AI Studio] API configured successfully (SDK version: {sdk_version})")
-    except:
-        print("[Google AI Studio] API configured successfully")
-else:
-    print("WARNING: GOOGLE_API_KEY not set in environment")
-    client = None
+logger = logging.getLogger(__name__)
+
+# Gemini 2.5 Flash Image (Nano Banana)
+IMAGE_MODEL = os.getenv("GEMINI_IMAGE_MODEL", "gemini-2.5-flash-image")
 
 AspectRatio = Literal["9:16", "16:9", "1:1"]
 
+# Output size and ratio per aspect ratio, used when the API ignores the requested ratio
+ASPECT_TARGETS = {
+    "16:9": (1920, 1080, 16 / 9),    # ~1.78
+    "9:16": (1080, 1920, 9 / 16),    # ~0.56
+    "1:1": (1024, 1024, 1.0),
+}
+
+# Request configs are the same for every call with a given aspect ratio - build them once
+GENERATE_CONFIGS = {
+    ratio: types.GenerateContentConfig(
+        imageConfig=types.ImageConfig(
+            aspectRatio=ratio
+        )
+    )
+    for ratio in ("9:16", "16:9", "1:1")
+}
+
+
+def _generate_config(aspect_ratio: str, candidate_count: int = 1) -> types.GenerateContentConfig:
+    config = GENERATE_CONFIGS.get(aspect_ratio)
+    if config is None:
+        # Not one of the supported ratios - let the API decide, as before
+        config = types.GenerateContentConfig(imageConfig=types.ImageConfig(aspectRatio=aspect_ratio))
+    if candidate_count > 1:
+        config = config.model_copy(update={"candidate_count": candidate_count})
+    return config
+
+
+# Whether the model returns several images for one request (candidate_count > 1).
+# None until the first multi-image request finds out; False sends N parallel requests instead
+_candidate_count_supported: Optional[bool] = None
+
+
+GEMINI_SEMAPHORE = asyncio.Semaphore(GEMINI_CONCURRENCY)
+
+# Longest edge of the image sent for img2img - the model doesn't need more, larger uploads only cost time
+EDIT_INPUT_MAX_EDGE = 1536
+
+# Rate limits (429) and server errors (5xx) are retried with backoff: ~1s, 2s, 4s
+GEMINI_MAX_ATTEMPTS = 4
+
+
+def _is_retryable(error: errors.APIError) -> bool:
+    return error.code == 429 or (error.code is not None and error.code >= 500)
+
+
+async def _generate_content(contents: list, aspect_ratio: str, candidate_count: int = 1):
+    """Call generate_content through the SDK's native async client, with bounded concurrency and retries"""
+    for attempt in range(GEMINI_MAX_ATTEMPTS):
+        try:
+            async with GEMINI_SEMAPHORE:
+                # client.aio awaits the HTTP response on the event loop - no thread per call
+                return await client.aio.models.generate_content(
+                    model=IMAGE_MODEL,
+                    contents=contents,
+                    config=_generate_config(aspect_ratio, candidate_count)
+                )
+        except errors.APIError as e:
+            if attempt == GEMINI_MAX_ATTEMPTS - 1 or not _is_retryable(e):
+                raise
+            # Sleep outside the semaphore so other calls can use the slot meanwhile
+            delay = 2 ** attempt * random.uniform(0.75, 1.25)
+            logger.warning("Gemini call failed (%s), retrying in %.1fs", e.code, delay)
+            await asyncio.sleep(delay)
+
+
+# Raised when no request of a batch produced an image and the responses gave no better reason
+NO_IMAGES_ERROR = "Please write your prompt in English only (Hebrew/Russian/other languages are not supported)"
+
+
+class NoImageError(Exception):
+    """A response carried no image; the message is the user-facing reason"""
+
 
 def get_user_friendly_error(finish_reason, safety_ratings=None, context="generate"):
     """Convert API errors to user-friendly messages"""
@@ -37,10 +108,233 @@ def get_user_friendly_error(finish_reason, safety_ratings=None, context="generat
         return f"Could not {context} image. Please use English language in your prompt"
 
 
+def _response_candidates(response, idx: int) -> list:
+    """Candidates of a response; raises NoImageError if there are none (e.g. prompt blocked)"""
+    # getattr with defaults - one lookup per level instead of hasattr + attribute access
+    candidates = getattr(response, 'candidates', None)
+    if not candidates:
+        logger.warning("Response %d: no candidates, skipping", idx + 1)
+        raise NoImageError(get_user_friendly_error(None))
+    return candidates
+
+
+def _extract_image_bytes(candidate, idx: int) -> bytes:
+    """Return the first inline image of a response candidate
+    
+    Raises:
+        NoImageError: blocked/empty candidate, with the classified user-facing reason
+    """
+    finish_reason = getattr(candidate, 'finish_reason', None)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Response %d finish_reason: %s, safety_ratings: %s",
+            idx + 1, finish_reason, getattr(candidate, 'safety_ratings', None)
+        )
+    
+    # Blocked or text-only answers stop here - no parts walk, no PIL
+    parts = getattr(getattr(candidate, 'content', None), 'parts', None)
+    if not parts:
+        logger.warning("Response %d: no content (reason: %s), skipping", idx + 1, finish_reason)
+        raise NoImageError(get_user_friendly_error(finish_reason))
+    
+    for part in parts:
+        inline_data = part.inline_data
+        if inline_data is not None and inline_data.data:
+            return inline_data.data
+    
+    logger.warning("Response %d: no image part (reason: %s), skipping", idx + 1, finish_reason)
+    raise NoImageError(get_user_friendly_error(finish_reason))
+
+
+def _fix_aspect_ratio(image_bytes: bytes, aspect_ratio: AspectRatio) -> bytes:
+    """Center-crop and resize the image if the API ignored the requested aspect ratio"""
+    target = ASPECT_TARGETS.get(aspect_ratio)
+    if target is None:
+        # No target size for this ratio (the API decided) - nothing to check against
+        return image_bytes
+    target_width, target_height, target_ratio = target
+    
+    # Check actual image dimensions from API
+    try:
+        # Dimensions straight from the file header - no PIL object on the common (correct ratio) path
+        image_format, api_width, api_height = sniff_image(image_bytes)
+        logger.debug("Image from API: %dx%d (ratio: %.2f)", api_width, api_height, api_width / api_height)
+        
+        # Check if API returned correct aspect ratio (tolerance 0.1), in integers:
+        # |w/h - tw/th| <= 0.1  <=>  10 * |w*th - h*tw| <= h*th
+        if 10 * abs(api_width * target_height - api_height * target_width) <= api_height * target_height:
+            logger.debug("API returned correct aspect ratio")
+            return image_bytes
+        
+        logger.warning(
+            "API ignored aspectRatio! Expected %s (%.2f), got %.2f",
+            aspect_ratio, target_ratio, api_width / api_height
+        )
+        logger.info("Applying post-processing to fix aspect ratio")
+        
+        with PILImage.open(io.BytesIO(image_bytes)) as source:
+            # Let JPEG input decode at a reduced scale (no-op for PNG) - fewer pixels to crop/resize
+            source.draft('RGB', (target_width * 2, target_height * 2))
+            api_width, api_height = source.size
+            
+            # Crop box for the target aspect ratio
+            if api_width * target_height > api_height * target_width:
+                # Wider - crop width
+                new_width = api_height * target_width // target_height
+                left = (api_width - new_width) // 2
+                crop_box = (left, 0, left + new_width, api_height)
+            else:
+                # Taller - crop height
+                new_height = api_width * target_height // target_width
+                top = (api_height - new_height) // 2
+                crop_box = (0, top, api_width, top + new_height)
+            
+            # Crop and resize in one resampling pass (box=) - no intermediate cropped copy.
+            # reducing_gap box-reduces large sources before LANCZOS
+            pil_img = source.resize(
+                (target_width, target_height), PILImage.LANCZOS, box=crop_box, reducing_gap=3.0
+            )
+        
+        # Convert back to bytes in the format the API sent, with fast encoder settings
+        # (the bytes are cached, not archived)
+        buffer = io.BytesIO()
+        with pil_img:
+            if image_format == 'JPEG':
+                if pil_img.mode not in ('RGB', 'L'):
+                    pil_img = pil_img.convert('RGB')
+                pil_img.save(buffer, format='JPEG', quality=90, subsampling=2)
+            else:
+                pil_img.save(buffer, format='PNG', compress_level=1)
+        
+        logger.info("Fixed dimensions: %dx%d", target_width, target_height)
+        return buffer.getvalue()
+    
+    except Exception as e:
+        logger.warning("Could not verify dimensions: %s", e)
+        return image_bytes
+
+
+def _process_image(image_bytes: bytes, idx: int, aspect_ratio: AspectRatio) -> Optional[bytes]:
+    """Aspect-fix one extracted image (None if it is not usable)"""
+    try:
+        image_bytes = _fix_aspect_ratio(image_bytes, aspect_ratio)
+        logger.debug("Image %d final size: %d bytes", idx + 1, len(image_bytes))
+        return image_bytes
+    
+    except Exception:
+        logger.exception("Image %d failed", idx + 1)
+        return None
+
+
+def _validate_request(prompt: str, num_images: int, context: str) -> int:
+    """Check the API key and prompt; returns num_images clamped to 1-4 (out of range -> 1)"""
+    if not GOOGLE_API_KEY or not client:
+        raise Exception("GOOGLE_API_KEY not set in environment")
+    
+    # Validate prompt
+    if not prompt or prompt.strip() == "":
+        raise Exception(f"Please write a prompt in English to {context} image")
+    
+    # Validate num_images
+    if num_images < 1 or num_images > 4:
+        num_images = 1
+    return num_images
+
+
+async def _process_candidate(candidate, idx: int, aspect_ratio: AspectRatio) -> Optional[bytes]:
+    # Cheap attribute walk on the loop - empty responses raise before any thread hop
+    image_bytes = _extract_image_bytes(candidate, idx)
+    # Post-process right away, while the other requests are still in flight
+    # (on the CPU pool - Pillow releases the GIL during decode/resize/encode)
+    return await run_cpu(_process_image, image_bytes, idx, aspect_ratio)
+
+
+async def _generate_one(contents: list, idx: int, aspect_ratio: AspectRatio) -> Optional[bytes]:
+    # Use generate_content with imageConfig for native aspect_ratio support (SDK 1.56.0+)
+    response = await _generate_content(contents, aspect_ratio)
+    return await _process_candidate(_response_candidates(response, idx)[0], idx, aspect_ratio)
+
+
+async def _generate_batch(contents: list, aspect_ratio: AspectRatio, num_images: int) -> list:
+    """Ask for num_images candidates in one request - one round trip instead of N
+    
+    Returns the candidates received (empty if the model rejects candidate_count);
+    the caller requests whatever is missing in parallel.
+    """
+    global _candidate_count_supported
+    try:
+        response = await _generate_content(contents, aspect_ratio, candidate_count=num_images)
+    except errors.APIError as e:
+        # Any other 400 (bad prompt, rejected image) is the request's own error, not a
+        # verdict on candidate_count - and a concurrent probe may already have flipped the flag
+        if e.code != 400 or "candidate" not in (e.message or "").lower():
+            raise
+        logger.info("Model rejected candidate_count=%d (%s) - using parallel requests", num_images, e.message)
+        _candidate_count_supported = False
+        return []
+    
+    candidates = _response_candidates(response, 0)
+    if _candidate_count_supported is None:
+        # A model that silently returns one candidate would make every batch two round trips
+        _candidate_count_supported = len(candidates) >= num_images
+        logger.info("Multiple candidates per request supported: %s", _candidate_count_supported)
+    return candidates[:num_images]
+
+
+async def _stream_images(
+    contents: list,
+    aspect_ratio: AspectRatio,
+    num_images: int,
+    max_images: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Run num_images requests in parallel and yield each image as soon as it is ready
+    
+    Stops after max_images images; requests still running at that point (or when
+    the consumer stops iterating) are cancelled.
+    
+    Raises:
+        Exception: no request produced an image (message says why, for the user)
+    """
+    jobs = []
+    if num_images > 1 and _candidate_count_supported is not False:
+        try:
+            candidates = await _generate_batch(contents, aspect_ratio, num_images)
+        except NoImageError as e:
+            # Whole prompt blocked - separate requests would be blocked the same way
+            raise Exception(str(e))
+        jobs = [_process_candidate(candidate, idx, aspect_ratio) for idx, candidate in enumerate(candidates)]
+    jobs += [_generate_one(contents, idx, aspect_ratio) for idx in range(len(jobs), num_images)]
+    
+    tasks = [asyncio.ensure_future(job) for job in jobs]
+    yielded = 0
+    no_image_reason = NO_IMAGES_ERROR
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                image = await next_done
+            except NoImageError as e:
+                no_image_reason = str(e)
+                continue
+            if image is None:
+                continue
+            yield image
+            yielded += 1
+            if max_images is not None and yielded >= max_images:
+                return
+    finally:
+        for task in tasks:
+            task.cancel()
+    
+    if yielded == 0:
+        raise Exception(no_image_reason)
+
+
 async def generate_image_from_prompt(
     prompt: str,
     aspect_ratio: AspectRatio = "16:9",
-    num_images: int = 1
+    num_images: int = 1,
+    use_cache: bool = True
 ) -> list[bytes]:
     """Generate images using Gemini 2.5 Flash Image (Nano Banana) - text2img
     
@@ -48,150 +342,81 @@ async def generate_image_from_prompt(
         prompt: Text description in English
         aspect_ratio: Image aspect ratio (16:9, 9:16, 1:1)
         num_images: Number of images to generate (1-4)
+        use_cache: Reuse results of a recent identical request (False always calls the API)
     
     Returns:
         List of image bytes
     """
     
-    if not GOOGLE_API_KEY or not client:
-        raise Exception("GOOGLE_API_KEY not set in environment")
-    
-    # Validate prompt
-    if not prompt or prompt.strip() == "":
-        raise Exception("Please write a prompt in English to generate image")
+    num_images = _validate_request(prompt, num_images, "generate")
     
-    # Validate num_images
-    if num_images < 1 or num_images > 4:
-        num_images = 1
+    logger.info("Generating %d image(s) (text2img) with prompt: %s", num_images, prompt)
+    logger.debug("Aspect ratio: %s", aspect_ratio)
     
-    print(f"[Nano Banana] Generating {num_images} image(s) (text2img) with prompt: {prompt}")
-    print(f"[Nano Banana] Aspect ratio: {aspect_ratio}")
+    generate = partial(_generate_from_prompt, prompt, aspect_ratio, num_images)
+    if not use_cache:
+        return await generate()
     
-    # Generate multiple images in parallel
-    import asyncio
+    # Same prompt + aspect ratio as a recent (or in-flight) request - reuse its images
+    cache_key = generation_cache.cache_key(IMAGE_MODEL, prompt, aspect_ratio, num_images)
+    return await generation_cache.get_or_generate(cache_key, generate, num_images)
+
+
+async def generate_images_batch(
+    prompts: list[str],
+    aspect_ratio: AspectRatio = "16:9",
+    num_images: int = 1
+) -> list[list[bytes]]:
+    """Generate images for several prompts concurrently
     
-    async def generate_single():
-        # Use generate_content with imageConfig for native aspect_ratio support (SDK 1.56.0+)
-        response = client.models.generate_content(
-            model='gemini-2.5-flash-image',
-            contents=[prompt],
-            config=types.GenerateContentConfig(
-                imageConfig=types.ImageConfig(
-                    aspectRatio=aspect_ratio
-                )
-            )
-        )
-        return response
+    All calls share GEMINI_SEMAPHORE and the pooled connection, so a large batch
+    queues instead of tripping the rate limit. Identical prompts share one generation
+    through the cache.
     
-    # Generate all images in parallel
-    responses = await asyncio.gather(*[generate_single() for _ in range(num_images)])
+    Returns:
+        Images per prompt, in prompt order - a prompt that failed gets an empty list
+        (the error is logged)
+    """
+    results = await asyncio.gather(
+        *(generate_image_from_prompt(prompt, aspect_ratio, num_images) for prompt in prompts),
+        return_exceptions=True
+    )
+    
+    batch = []
+    for prompt, result in zip(prompts, results):
+        if isinstance(result, BaseException):
+            logger.warning("Batch prompt %r failed: %s", prompt, result)
+            result = []
+        batch.append(result)
+    return batch
+
+
+async def generate_image_stream(
+    prompt: str,
+    aspect_ratio: AspectRatio = "16:9",
+    num_images: int = 1,
+    max_images: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Like generate_image_from_prompt, but yields each image as soon as it is ready
+    
+    The first image arrives after the fastest request instead of the slowest one.
+    Pass max_images (e.g. 1) to stop early and cancel the requests still running.
+    Results are not cached.
+    """
     
-    print(f"[Nano Banana] {len(responses)} responses received")
+    num_images = _validate_request(prompt, num_images, "generate")
     
-    # Extract images from all responses
-    all_images = []
+    logger.info("Streaming %d image(s) (text2img) with prompt: %s", num_images, prompt)
     
-    for idx, response in enumerate(responses):
-        print(f"[Nano Banana] Processing response {idx+1}/{len(responses)}. Type: {type(response)}")
-        
-        # Extract image from response
-        try:
-            if not hasattr(response, 'candidates') or not response.candidates:
-                print(f"[WARNING] Response {idx+1}: No candidates, skipping")
-                continue
-            
-            candidate = response.candidates[0]
-            
-            finish_reason = getattr(candidate, 'finish_reason', 'unknown')
-            safety_ratings = getattr(candidate, 'safety_ratings', None)
-            
-            if hasattr(candidate, 'finish_reason'):
-                print(f"[DEBUG] Response {idx+1} finish_reason: {candidate.finish_reason}")
-            if hasattr(candidate, 'safety_ratings'):
-                print(f"[DEBUG] Response {idx+1} safety_ratings: {candidate.safety_ratings}")
-            
-            if not hasattr(candidate, 'content') or not candidate.content:
-                print(f"[WARNING] Response {idx+1}: No content (reason: {finish_reason}), skipping")
-                continue
-            
-            if not hasattr(candidate.content, 'parts') or not candidate.content.parts:
-                print(f"[WARNING] Response {idx+1}: No parts, skipping")
-                continue
-            
-            for part in candidate.content.parts:
-                if part.inline_data:
-                    image_bytes = part.inline_data.data
-                    
-                    # Check actual image dimensions from API
-                    try:
-                        pil_img = PILImage.open(io.BytesIO(image_bytes))
-                        api_width, api_height = pil_img.size
-                        api_ratio = api_width / api_height
-                        print(f"[Nano Banana] Image from API: {api_width}x{api_height} (ratio: {api_ratio:.2f})")
-                        
-                        # Define target ratios
-                        target_ratios = {
-                            "16:9": 16/9,    # ~1.78
-                            "9:16": 9/16,    # ~0.56
-                            "1:1": 1.0       # 1.0
-                        }
-                        
-                        target_ratio = target_ratios[aspect_ratio]
-                        
-                        # Check if API returned correct aspect ratio (tolerance 0.1)
-                        if abs(api_ratio - target_ratio) > 0.1:
-                            print(f"[WARNING] API ignored aspectRatio! Expected {aspect_ratio} ({target_ratio:.2f}), got {api_ratio:.2f}")
-                            print(f"[Fallback] Applying post-processing to fix aspect ratio...")
-                            
-                            # Apply post-processing to fix aspect ratio
-                            target_dims = {
-                                "16:9": (1920, 1080),
-                                "9:16": (1080, 1920),
-                                "1:1": (1024, 1024)
-                            }
-                            target_width, target_height = target_dims[aspect_ratio]
-                            
-                            # Crop to target aspect ratio
-                            if api_ratio > target_ratio:
-                                # Wider - crop width
-                                new_width = int(api_height * target_ratio)
-                                left = (api_width - new_width) // 2
-                                pil_img = pil_img.crop((left, 0, left + new_width, api_height))
-                            else:
-                                # Taller - crop height
-                                new_height = int(api_width / target_ratio)
-                                top = (api_height - new_height) // 2
-                                pil_img = pil_img.crop((0, top, api_width, top + new_height))
-                            
-                            # Resize to target dimensions
-                            pil_img = pil_img.resize((target_width, target_height), PILImage.LANCZOS)
-                            
-                            # Convert back to bytes
-                            buffer = io.BytesIO()
-                            pil_img.save(buffer, format='PNG')
-                            buffer.seek(0)
-                            image_bytes = buffer.getvalue()
-                            
-                            print(f"[Fallback] Fixed dimensions: {pil_img.size}")
-                        else:
-                            print(f"[SUCCESS] API returned correct aspect ratio!")
-                        
-                    except Exception as e:
-                        print(f"[WARNING] Could not verify dimensions: {e}")
-                    
-                    print(f"[Nano Banana] Image {idx+1} final size: {len(image_bytes)} bytes")
-                    all_images.append(image_bytes)
-                    break  # Found image in this response
-        
-        except Exception as e:
-            print(f"[WARNING] Response {idx+1} failed: {e}")
-            continue
-    
-    # Check if we got at least one image
-    if len(all_images) == 0:
-        raise Exception("Please write your prompt in English only (Hebrew/Russian/other languages are not supported)")
+    async for image in _stream_images([prompt], aspect_ratio, num_images, max_images):
+        yield image
+
+
+async def _generate_from_prompt(prompt: str, aspect_ratio: AspectRatio, num_images: int) -> list[bytes]:
+    # Generate all images in parallel, collected in completion order
+    all_images = [image async for image in _stream_images([prompt], aspect_ratio, num_images)]
     
-    print(f"[Nano Banana] Successfully generated {len(all_images)}/{num_images} image(s)")
+    logger.info("Successfully generated %d/%d image(s)", len(all_images), num_images)
     return all_images
 
 
@@ -199,7 +424,8 @@ async def edit_image_with_prompt(
     image_bytes: bytes,
     prompt: str,
     aspect_ratio: AspectRatio = "16:9",
-    num_images: int = 1
+    num_images: int = 1,
+    use_cache: bool = True
 ) -> list[bytes]:
     """Edit existing image using Gemini 2.5 Flash Image (Nano Banana) - img2img
     
@@ -211,163 +437,53 @@ async def edit_image_with_prompt(
         prompt: Edit instruction in English
         aspect_ratio: Output aspect ratio (16:9, 9:16, 1:1)
         num_images: Number of variations to generate (1-4)
+        use_cache: Reuse results of a recent identical request (False always calls the API)
     
     Returns:
         List of edited image bytes
     """
     
-    if not GOOGLE_API_KEY or not client:
-        raise Exception("GOOGLE_API_KEY not set in environment")
-    
-    # Validate prompt
-    if not prompt or prompt.strip() == "":
-        raise Exception("Please write a prompt in English to edit image")
+    num_images = _validate_request(prompt, num_images, "edit")
     
     if len(image_bytes) == 0:
         raise Exception("Please upload an image")
     
-    # Validate num_images
-    if num_images < 1 or num_images > 4:
-        num_images = 1
-    
-    print(f"[Nano Banana] Editing image (img2img) - generating {num_images} variation(s)")
-    print(f"[Nano Banana] Prompt: {prompt}")
-    print(f"[Nano Banana] Aspect ratio: {aspect_ratio}")
-    print(f"[Nano Banana] Image bytes size: {len(image_bytes)}")
+    logger.info("Editing image (img2img) - generating %d variation(s)", num_images)
+    logger.info("Prompt: %s", prompt)
+    logger.debug("Aspect ratio: %s", aspect_ratio)
+    logger.debug("Image bytes size: %d", len(image_bytes))
     
-    # Convert to PIL Image
+    # Validate from the header only - pixels are decoded later, and only if the input needs shrinking
     try:
-        pil_image = PILImage.open(io.BytesIO(image_bytes))
-    except Exception as e:
+        image_format, input_width, input_height = sniff_image(image_bytes)
+    except ValueError as e:
         raise Exception(f"Failed to open image: {str(e)}")
     
-    print(f"[Nano Banana] PIL Image loaded: {pil_image.size}, mode: {pil_image.mode}")
-    
-    # Generate multiple variations in parallel
-    import asyncio
-    
-    async def edit_single():
-        # Use generate_content with image + prompt and imageConfig (SDK 1.56.0+)
-        response = client.models.generate_content(
-            model='gemini-2.5-flash-image',
-            contents=[prompt, pil_image],
-            config=types.GenerateContentConfig(
-                imageConfig=types.ImageConfig(
-                    aspectRatio=aspect_ratio
-                )
-            )
-        )
-        return response
-    
-    # Generate all variations in parallel
-    responses = await asyncio.gather(*[edit_single() for _ in range(num_images)])
-    
-    print(f"[Nano Banana] {len(responses)} edit responses received")
+    logger.debug("Input image: %dx%d, format: %s", input_width, input_height, image_format)
     
-    # Extract images from all responses
-    all_images = []
+    generate = partial(_edit_from_prompt, image_bytes, prompt, aspect_ratio, num_images)
+    if not use_cache:
+        return await generate()
     
-    for idx, response in enumerate(responses):
-        print(f"[Nano Banana] Processing edit response {idx+1}/{len(responses)}. Type: {type(response)}")
-        
-        # Extract image from response
-        try:
-            if not hasattr(response, 'candidates') or not response.candidates:
-                print(f"[WARNING] Response {idx+1}: No candidates, skipping")
-                continue
-            
-            candidate = response.candidates[0]
-            
-            finish_reason = getattr(candidate, 'finish_reason', 'unknown')
-            safety_ratings = getattr(candidate, 'safety_ratings', None)
-            
-            if hasattr(candidate, 'finish_reason'):
-                print(f"[DEBUG] Response {idx+1} finish_reason: {candidate.finish_reason}")
-            if hasattr(candidate, 'safety_ratings'):
-                print(f"[DEBUG] Response {idx+1} safety_ratings: {candidate.safety_ratings}")
-            
-            if not hasattr(candidate, 'content') or not candidate.content:
-                print(f"[WARNING] Response {idx+1}: No content (reason: {finish_reason}), skipping")
-                continue
-            
-            if not hasattr(candidate.content, 'parts') or not candidate.content.parts:
-                print(f"[WARNING] Response {idx+1}: No parts, skipping")
-                continue
-            
-            for part in candidate.content.parts:
-                if part.inline_data:
-                    image_bytes = part.inline_data.data
-                    
-                    # Check actual image dimensions from API
-                    try:
-                        pil_img = PILImage.open(io.BytesIO(image_bytes))
-                        api_width, api_height = pil_img.size
-                        api_ratio = api_width / api_height
-                        print(f"[Nano Banana] Edited image from API: {api_width}x{api_height} (ratio: {api_ratio:.2f})")
-                        
-                        # Define target ratios
-                        target_ratios = {
-                            "16:9": 16/9,    # ~1.78
-                            "9:16": 9/16,    # ~0.56
-                            "1:1": 1.0       # 1.0
-                        }
-                        
-                        target_ratio = target_ratios[aspect_ratio]
-                        
-                        # Check if API returned correct aspect ratio (tolerance 0.1)
-                        if abs(api_ratio - target_ratio) > 0.1:
-                            print(f"[WARNING] API ignored aspectRatio! Expected {aspect_ratio} ({target_ratio:.2f}), got {api_ratio:.2f}")
-                            print(f"[Fallback] Applying post-processing to fix aspect ratio...")
-                            
-                            # Apply post-processing to fix aspect ratio
-                            target_dims = {
-                                "16:9": (1920, 1080),
-                                "9:16": (1080, 1920),
-                                "1:1": (1024, 1024)
-                            }
-                            target_width, target_height = target_dims[aspect_ratio]
-                            
-                            # Crop to target aspect ratio
-                            if api_ratio > target_ratio:
-                                # Wider - crop width
-                                new_width = int(api_height * target_ratio)
-                                left = (api_width - new_width) // 2
-                                pil_img = pil_img.crop((left, 0, left + new_width, api_height))
-                            else:
-                                # Taller - crop height
-                                new_height = int(api_width / target_ratio)
-                                top = (api_height - new_height) // 2
-                                pil_img = pil_img.crop((0, top, api_width, top + new_height))
-                            
-                            # Resize to target dimensions
-                            pil_img = pil_img.resize((target_width, target_height), PILImage.LANCZOS)
-                            
-                            # Convert back to bytes
-                            buffer = io.BytesIO()
-                            pil_img.save(buffer, format='PNG')
-                            buffer.seek(0)
-                            image_bytes = buffer.getvalue()
-                            
-                            print(f"[Fallback] Fixed dimensions: {pil_img.size}")
-                        else:
-                            print(f"[SUCCESS] API returned correct aspect ratio!")
-                        
-                    except Exception as e:
-                        print(f"[WARNING] Could not verify dimensions: {e}")
-                    
-                    print(f"[Nano Banana] Edited image {idx+1} final size: {len(image_bytes)} bytes")
-                    all_images.append(image_bytes)
-                    break  # Found image in this response
-        
-        except Exception as e:
-            print(f"[WARNING] Response {idx+1} failed: {e}")
-            continue
+    # Same image + prompt + aspect ratio as a recent (or in-flight) request - reuse its variations
+    cache_key = generation_cache.cache_key(IMAGE_MODEL, prompt, aspect_ratio, num_images, image_bytes)
+    return await generation_cache.get_or_generate(cache_key, generate, num_images)
+
+
+async def _edit_from_prompt(
+    image_bytes: bytes,
+    prompt: str,
+    aspect_ratio: AspectRatio,
+    num_images: int
+) -> list[bytes]:
+    # Prepare the input once for all variations (cache hits never get here)
+    data, data_mime_type = await run_cpu(downscale_image, image_bytes, EDIT_INPUT_MAX_EDGE)
+    image_part = types.Part.from_bytes(data=data, mime_type=data_mime_type)
     
-    # Check if we got at least one image
-    if len(all_images) == 0:
-        raise Exception("Please write your prompt in English only (Hebrew/Russian/other languages are not supported)")
+    # Generate all variations in parallel (image + prompt), collected in completion order
+    all_images = [image async for image in _stream_images([prompt, image_part], aspect_ratio, num_images)]
     
-    print(f"[Nano Banana] Successfully edited {len(all_images)}/{num_images} variation(s)")
+    logger.info("Successfully edited %d/%d variation(s)", len(all_images), num_images)
     return all_images
 
 
@@ -2,16 +2,25 @@
 Text generation service using Gemini to analyze images and suggest Hebrew text
 """
 
+import asyncio
+import logging
 import os
-import base64
-from google import genai
 from google.genai import types
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-client = None
+from services.executors import run_cpu
+from services.genai_client import GEMINI_CONCURRENCY, GOOGLE_API_KEY, client
+from services.image_utils import downscale_image
 
-if GOOGLE_API_KEY:
-    client = genai.Client(api_key=GOOGLE_API_KEY)
+logger = logging.getLogger(__name__)
+
+# Use Gemini 2.0 Flash for vision
+TEXT_MODEL = os.getenv("GEMINI_TEXT_MODEL", "gemini-2.0-flash-exp")
+
+# Longest edge of the image sent for suggestions - plenty to read the product and composition
+SUGGEST_IMAGE_MAX_EDGE = 1024
+
+# Separate from the image semaphore - quick text calls shouldn't queue behind image generations
+TEXT_SEMAPHORE = asyncio.Semaphore(GEMINI_CONCURRENCY)
 
 async def generate_hebrew_marketing_text(
     image_bytes: bytes,
@@ -62,25 +71,31 @@ Requirements:
 
 Return ONLY the {lang_name} texts, one per line, without numbers or bullets."""
 
-        # Convert image to base64 for Gemini
-        image_b64 = base64.b64encode(image_bytes).decode('utf-8')
+        # Smaller upload, same suggestions - generated images are up to 1920px
+        try:
+            image_bytes, image_mime_type = await run_cpu(
+                downscale_image, image_bytes, SUGGEST_IMAGE_MAX_EDGE
+            )
+        except ValueError:
+            image_mime_type = "image/png"
         
-        # Call Gemini with vision
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-exp',  # Use Gemini 2.0 Flash for vision
-            contents=[
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_bytes(
-                            data=image_bytes,
-                            mime_type="image/png"
-                        ),
-                        types.Part.from_text(text=prompt)
-                    ]
-                )
-            ]
-        )
+        # Call Gemini with vision - the raw bytes go in the Part, the SDK encodes them for the wire
+        async with TEXT_SEMAPHORE:
+            response = await client.aio.models.generate_content(
+                model=TEXT_MODEL,
+                contents=[
+                    types.Content(
+                        role="user",
+                        parts=[
+                            types.Part.from_bytes(
+                                data=image_bytes,
+                                mime_type=image_mime_type
+                            ),
+                            types.Part.from_text(text=prompt)
+                        ]
+                    )
+                ]
+            )
         
         # Parse response
         if response and response.text:
@@ -89,7 +104,7 @@ Return ONLY the {lang_name} texts, one per line, without numbers or bullets."""
             texts = [t.lstrip('0123456789.-*•● ') for t in texts]
             texts = [t for t in texts if t and len(t) > 0]
             
-            print(f"[Gemini Text Suggestions] Generated {len(texts)} suggestions from image analysis")
+            logger.info("Generated %d suggestions from image analysis", len(texts))
             return texts[:5]
         
         # Fallback if no response
@@ -99,8 +114,8 @@ Return ONLY the {lang_name} texts, one per line, without numbers or bullets."""
             "קנה עכשיו"
         ]
     
-    except Exception as e:
-        print(f"[Gemini Text Suggestions] Error: {e}")
+    except Exception:
+        logger.exception("Text suggestion failed, using fallback texts")
         # Fallback on error
         return [
             "מבצע מיוחד!",
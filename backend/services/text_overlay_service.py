@@ -4,10 +4,15 @@ Text overlay service for adding text to images with Hebrew support
 
 from PIL import Image, ImageDraw, ImageFont
 import io
+import logging
 import os
-import glob
-from typing import Tuple, Optional
+import fnmatch
+from functools import lru_cache
+from typing import Tuple, Optional, Union
 
+from services.fonts import fonts_by_name
+
+logger = logging.getLogger(__name__)
 
 # Default font settings
 DEFAULT_FONT_SIZE = 48
@@ -40,38 +45,44 @@ HEBREW_FONTS = [
 ]
 
 
-def get_hebrew_font(font_size: int, font_family: str = "Arial", bold: bool = False) -> ImageFont.FreeTypeFont:
-    """Get a font that supports Hebrew characters"""
-    
-    # Expand glob patterns in font paths
-    expanded_fonts = []
+# Map font family names to possible font file patterns
+FONT_PATTERNS = {
+    "Arial": ["arial", "liberation"],
+    "Arial Black": ["ariblk", "liberation"],
+    "Calibri": ["dejavu", "liberation"],  # Fallback to DejaVu/Liberation
+    "Tahoma": ["dejavu", "liberation"],
+    "Verdana": ["dejavu", "liberation"],
+    "Impact": ["dejavu", "liberation"]
+}
+
+
+@lru_cache(maxsize=1)
+def get_installed_hebrew_fonts() -> tuple[str, ...]:
+    """Resolve HEBREW_FONTS to the files that actually exist (computed once per process)"""
+    installed = []
     for font_path in HEBREW_FONTS:
         if '*' in font_path:
-            # Expand glob pattern
-            expanded_fonts.extend(glob.glob(font_path))
-        else:
-            expanded_fonts.append(font_path)
+            # Glob entries are resolved against the shared font scan instead of re-globbing
+            path = fonts_by_name().get(os.path.basename(font_path).lower())
+            if path and fnmatch.fnmatch(path, font_path):
+                installed.append(path)
+        elif os.path.exists(font_path):
+            installed.append(font_path)
+    return tuple(installed)
+
+
+def get_hebrew_font(font_size: int, font_family: str = "Arial", bold: bool = False) -> ImageFont.FreeTypeFont:
+    """Get a font that supports Hebrew characters"""
     
-    # Map font family names to possible font file patterns
-    font_patterns = {
-        "Arial": ["arial", "liberation"],
-        "Arial Black": ["ariblk", "liberation"],
-        "Calibri": ["dejavu", "liberation"],  # Fallback to DejaVu/Liberation
-        "Tahoma": ["dejavu", "liberation"],
-        "Verdana": ["dejavu", "liberation"],
-        "Impact": ["dejavu", "liberation"]
-    }
+    installed_fonts = get_installed_hebrew_fonts()
     
     # Get patterns for requested font family
-    patterns = font_patterns.get(font_family, ["dejavu", "liberation", "arial"])
+    patterns = FONT_PATTERNS.get(font_family, ["dejavu", "liberation", "arial"])
     
-    print(f"[Font Search] Looking for: {font_family} (bold: {bold}, size: {font_size})")
+    logger.debug("Font search: %s (bold: %s, size: %s)", font_family, bold, font_size)
     
     # Try to find font matching family and bold
-    for font_path in expanded_fonts:
-        if not os.path.exists(font_path):
-            continue
-            
+    for font_path in installed_fonts:
         font_path_lower = font_path.lower()
         
         # Check if this font matches the requested family
@@ -88,26 +99,24 @@ def get_hebrew_font(font_size: int, font_family: str = "Arial", bold: bool = Fal
         
         try:
             font = ImageFont.truetype(font_path, font_size)
-            print(f"[Font Search] ✓ Using font: {font_path}")
+            logger.debug("Using font: %s", font_path)
             return font
         except Exception as e:
-            print(f"[Font Search] ✗ Failed to load {font_path}: {e}")
+            logger.warning("Failed to load font %s: %s", font_path, e)
             continue
     
     # Fallback: try ANY TrueType font (ignore family/bold requirements)
-    print(f"[Font Search] Could not find {font_family} (bold: {bold}), trying any font...")
-    for font_path in expanded_fonts:
-        if not os.path.exists(font_path):
-            continue
+    logger.info("Could not find font %s (bold: %s), trying any font", font_family, bold)
+    for font_path in installed_fonts:
         try:
             font = ImageFont.truetype(font_path, font_size)
-            print(f"[Font Search] ✓ Using fallback font: {font_path}")
+            logger.info("Using fallback font: %s", font_path)
             return font
         except Exception as e:
             continue
     
     # LAST RESORT: Create a large default font
-    print("[Font Search] ERROR: No TrueType fonts found! Using PIL default (will be tiny)")
+    logger.error("No TrueType fonts found! Using PIL default (will be tiny)")
     # Default font ignores size, but at least return something
     return ImageFont.load_default()
 
@@ -142,12 +151,10 @@ def add_text_to_image(
     """
     
     try:
-        # Load image
-        img = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGBA for transparency support
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
+        # Load image and convert to RGBA for transparency support
+        # (the decoded source is released when the with-block exits)
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            img = source.convert('RGBA')
         
         # Create a transparent overlay for text
         txt_layer = Image.new('RGBA', img.size, (255, 255, 255, 0))
@@ -173,11 +180,12 @@ def add_text_to_image(
             bbox = draw.textbbox((0, 0), text, font=font, stroke_width=stroke_width if stroke_color else 0)
             text_width = bbox[2] - bbox[0]
             x = x - text_width  # Shift left by text width
-            print(f"[PIL Text] RTL: Adjusted x from {x + text_width} to {x} (text_width: {text_width})")
+            logger.debug("RTL: adjusted x from %d to %d (text_width: %d)", x + text_width, x, text_width)
         
-        print(f"[PIL Text] Drawing at ({x}, {y})")
-        print(f"[PIL Text] Font size: {font_size}px")
-        print(f"[PIL Text] Text: '{text}' (direction: {text_direction})")
+        logger.debug(
+            "Drawing '%s' at (%s, %s), font size %dpx, direction: %s",
+            text, x, y, font_size, text_direction
+        )
         
         # Draw text with outline (stroke) if specified
         # Try with direction parameter first (requires libraqm)
@@ -202,7 +210,7 @@ def add_text_to_image(
                 )
         except (KeyError, ValueError) as e:
             # Fallback without direction parameter if libraqm is not available
-            print(f"[PIL Text] WARNING: RTL not supported ({e}), drawing without direction parameter")
+            logger.warning("RTL not supported (%s), drawing without direction parameter", e)
             if stroke_color and stroke_width > 0:
                 draw.text(
                     (x, y),
@@ -221,46 +229,51 @@ def add_text_to_image(
                 )
         
         # Composite the text layer onto the original image
-        img = Image.alpha_composite(img, txt_layer)
+        # Intermediate layers are closed as soon as they are consumed - each is a full-size pixel buffer
+        composed = Image.alpha_composite(img, txt_layer)
+        img.close()
+        txt_layer.close()
         
-        # Convert back to RGB if needed
-        if img.mode == 'RGBA':
-            # Create white background
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            background.paste(img, mask=img.split()[3])  # Use alpha channel as mask
-            img = background
+        # Convert back to RGB on a white background
+        with composed:
+            img = Image.new('RGB', composed.size, (255, 255, 255))
+            img.paste(composed, mask=composed.getchannel('A'))  # Use alpha channel as mask
         
-        # Save to bytes
+        # Save to bytes - zlib level 1 is several times faster than the default 6 for a slightly larger file
         output = io.BytesIO()
-        img.save(output, format='PNG')
-        output.seek(0)
+        with img:
+            img.save(output, format='PNG', compress_level=1)
         
-        print(f"[Text Overlay] Added text '{text}' at position {position}")
+        logger.debug("Added text '%s' at position %s", text, position)
         return output.getvalue()
     
     except Exception as e:
-        print(f"[Text Overlay] Error: {e}")
+        logger.exception("Adding text failed")
         raise Exception(f"Failed to add text to image: {str(e)}")
 
 
 def preview_text_positions(
-    image_bytes: bytes,
+    image: Union[bytes, str, os.PathLike],
     text: str,
     font_size: int = DEFAULT_FONT_SIZE
 ) -> list[dict]:
     """
     Suggest good positions for text based on image content
     Returns list of suggested positions with coordinates
+    
+    Args:
+        image: Image bytes or path to the image file (a path lets PIL read only the header)
     """
     
     try:
-        img = Image.open(io.BytesIO(image_bytes))
-        width, height = img.size
+        source = io.BytesIO(image) if isinstance(image, (bytes, bytearray)) else image
+        with Image.open(source) as img:
+            # Only the header is parsed - pixel data is never decoded
+            width, height = img.size
         
-        # Get font to calculate text dimensions
+        # Get font to calculate text dimensions (no ImageDraw - it would force a full decode)
         font = get_hebrew_font(font_size)
-        draw = ImageDraw.Draw(img)
-        bbox = draw.textbbox((0, 0), text, font=font)
+        bbox = font.getbbox(text)
         text_width = bbox[2] - bbox[0]
         text_height = bbox[3] - bbox[1]
         
@@ -279,5 +292,5 @@ def preview_text_positions(
         return suggestions
     
     except Exception as e:
-        print(f"[Text Overlay] Error previewing positions: {e}")
+        logger.warning("Previewing text positions failed: %s", e)
         return []
@@ -0,0 +1,95 @@
+"""
+Regression test for the candidate_count probe in imagen_service.
+Runs against a stubbed client - no API key or network needed.
+"""
+
+import asyncio
+import io
+import os
+import sys
+from types import SimpleNamespace
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from google.genai import errors
+from PIL import Image
+
+from services import imagen_service
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (1344, 768), "blue").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _response(data: bytes):
+    part = SimpleNamespace(inline_data=SimpleNamespace(data=data, mime_type="image/png"), text=None)
+    candidate = SimpleNamespace(finish_reason="STOP", safety_ratings=None, content=SimpleNamespace(parts=[part]))
+    return SimpleNamespace(candidates=[candidate])
+
+
+def _client_error(message: str) -> errors.ClientError:
+    return errors.ClientError(400, {"error": {"code": 400, "message": message, "status": "INVALID_ARGUMENT"}})
+
+
+def _stub_client(batch_error: str):
+    """Client that answers single-candidate calls and rejects candidate_count > 1 with batch_error"""
+    image = _png()
+
+    async def generate_content(model=None, contents=None, config=None):
+        # Let concurrent requests all send their batch call before the first 400 comes back
+        await asyncio.sleep(0.05)
+        if config.candidate_count and config.candidate_count > 1:
+            raise _client_error(batch_error)
+        return _response(image)
+
+    return SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+
+
+async def test_concurrent_probe():
+    """Two multi-image requests in a fresh process both fall back when candidate_count is unsupported"""
+    print("\n=== Testing concurrent candidate_count probe ===")
+    imagen_service.client = _stub_client("Multiple candidates is not enabled for this model")
+    imagen_service._candidate_count_supported = None
+
+    results = await asyncio.gather(
+        imagen_service.generate_image_from_prompt("a cat", "16:9", 4, use_cache=False),
+        imagen_service.generate_image_from_prompt("a dog", "16:9", 4, use_cache=False),
+        return_exceptions=True
+    )
+    counts = [len(r) if isinstance(r, list) else type(r).__name__ for r in results]
+    print(f"Results: {counts}, supported: {imagen_service._candidate_count_supported}")
+    return counts == [4, 4] and imagen_service._candidate_count_supported is False
+
+
+async def test_unrelated_400():
+    """A 400 about the request itself is raised and doesn't turn candidate_count off"""
+    print("\n=== Testing unrelated 400 on the first batch ===")
+    imagen_service.client = _stub_client("Unable to process input image")
+    imagen_service._candidate_count_supported = None
+
+    try:
+        await imagen_service.generate_image_from_prompt("a cat", "16:9", 4, use_cache=False)
+        raised = False
+    except errors.ClientError:
+        raised = True
+    print(f"Raised: {raised}, supported: {imagen_service._candidate_count_supported}")
+    return raised and imagen_service._candidate_count_supported is None
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("Testing candidate_count fallback")
+    print("=" * 70)
+
+    test1 = asyncio.run(test_concurrent_probe())
+    test2 = asyncio.run(test_unrelated_400())
+
+    print("\n" + "=" * 70)
+    print("Summary:")
+    print("=" * 70)
+    print(f"Concurrent probe: {'PASSED' if test1 else 'FAILED'}")
+    print(f"Unrelated 400: {'PASSED' if test2 else 'FAILED'}")
+    sys.exit(0 if test1 and test2 else 1)
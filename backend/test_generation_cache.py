@@ -0,0 +1,76 @@
+"""
+Regression test for the disk layer of generation_cache.
+Runs against a temporary directory and a stubbed generator - no API key or network needed.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services import generation_cache
+
+TTL = 1.0
+
+
+def _stub_generate():
+    """Generator that counts its calls"""
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        return [b"image-1", b"image-2"]
+
+    return generate, calls
+
+
+async def _wait_for_disk(key: str):
+    # The disk write runs in the background
+    for _ in range(100):
+        if generation_cache._disk_path(key).exists():
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_disk_hits_dont_extend_ttl():
+    """A disk entry that keeps getting read still expires TTL seconds after it was generated"""
+    print("\n=== Testing disk cache TTL ===")
+    generate, calls = _stub_generate()
+    key = generation_cache.cache_key("model", "a cat", "1:1", 2)
+
+    await generation_cache.get_or_generate(key, generate, 2)
+    await _wait_for_disk(key)
+
+    # Drop the memory layer so the next lookups go to disk
+    time.sleep(TTL * 0.6)
+    generation_cache._cache.clear()
+    await generation_cache.get_or_generate(key, generate, 2)
+    memory_ttl = generation_cache._cache[key][0] - time.monotonic()
+    print(f"Disk hit: calls {len(calls)}, memory TTL left {memory_ttl:.2f}s")
+    hit_ok = len(calls) == 1 and memory_ttl < TTL * 0.5
+
+    time.sleep(TTL * 0.6)
+    generation_cache._cache.clear()
+    await generation_cache.get_or_generate(key, generate, 2)
+    print(f"After the TTL: calls {len(calls)}")
+    return hit_ok and len(calls) == 2
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("Testing generation cache")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        generation_cache.GENERATION_CACHE_DIR = cache_dir
+        generation_cache.GENERATION_CACHE_TTL = TTL
+        test1 = asyncio.run(test_disk_hits_dont_extend_ttl())
+
+    print("\n" + "=" * 70)
+    print("Summary:")
+    print("=" * 70)
+    print(f"Disk cache TTL: {'PASSED' if test1 else 'FAILED'}")
+    sys.exit(0 if test1 else 1)
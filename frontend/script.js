@@ -1,6 +1,7 @@
 let currentImageId = null;
 let currentImageData = null;
 let currentLang = 'he'; // Default Hebrew
+let lastRequestKey = null; // Last submitted request - repeating it asks for new variations
 
 // Translations
 const translations = {
@@ -116,6 +117,16 @@ imageForm.addEventListener('submit', async (e) => {
     
     const formData = new FormData(imageForm);
     
+    // Same prompt/format/image again - the user wants new variations, not the cached result
+    const requestKey = JSON.stringify([
+        promptValue,
+        formData.get('aspect_ratio'),
+        imageFile ? [imageFile.name, imageFile.size, imageFile.lastModified] : null
+    ]);
+    if (requestKey === lastRequestKey) {
+        formData.append('regenerate', 'true');
+    }
+    
     generateBtn.disabled = true;
     generateBtnText.style.display = 'none';
     generateLoader.style.display = 'inline-block';
@@ -133,6 +144,7 @@ imageForm.addEventListener('submit', async (e) => {
         }
         
         const data = await response.json();
+        lastRequestKey = requestKey;
         
         // Check if multiple images or single image
         if (data.images && data.images.length > 0) {
@@ -148,7 +160,7 @@ imageForm.addEventListener('submit', async (e) => {
             step2.style.display = 'block';
             
             // Display generated image
-            generatedImage.src = data.image_base64;
+            generatedImage.src = data.image_url;
         }
         
         showSuccess(t('imageCreatedSuccess'));
@@ -174,8 +186,9 @@ editBtn.addEventListener('click', async () => {
         const response = await fetch(`/api/download/${currentImageId}`);
         const blob = await response.blob();
         
-        // Create File from blob
-        const file = new File([blob], `${currentImageId}.png`, { type: 'image/png' });
+        // Create File from blob (keeps the format the server sent - PNG or JPEG)
+        const type = blob.type || 'image/png';
+        const file = new File([blob], `${currentImageId}.${type === 'image/jpeg' ? 'jpg' : 'png'}`, { type });
         
         // Create DataTransfer to set files
         const dataTransfer = new DataTransfer();
@@ -318,7 +331,7 @@ function displayImagesGrid(images) {
         imageItem.dataset.imageData = JSON.stringify(img);
         
         const imgElement = document.createElement('img');
-        imgElement.src = img.image_base64;
+        imgElement.src = img.image_url;
         imgElement.alt = `Generated image ${index + 1}`;
         
         const badge = document.createElement('div');
@@ -367,7 +380,7 @@ function selectImage(imageItem) {
     currentImageData = imageData;
     
     // Also update the single image display (hidden but used for download/edit)
-    generatedImage.src = imageData.image_base64;
+    generatedImage.src = imageData.image_url;
 }
 
 // Language switching
@@ -465,7 +478,7 @@ function openTextEditor() {
     textEditorModal.style.display = 'block';
     
     // Load image onto canvas
-    loadImageToCanvas(currentImageData.image_base64);
+    loadImageToCanvas(currentImageData.image_url);
     
     // Reset text input
     textInput.value = '';
@@ -771,12 +784,15 @@ applyTextBtn.addEventListener('click', async () => {
         
         console.log('[Apply Text] Success:', data);
         
+        // Text result IDs can repeat - bust the browser cache for the new version
+        data.image_url = `${data.image_url}?v=${Date.now()}`;
+        
         // Update current image with text version
         currentImageId = data.image_id;
         currentImageData = data;
         
         // Update main result image
-        generatedImage.src = data.image_base64;
+        generatedImage.src = data.image_url;
         generatedImage.style.display = 'block';
         
         // Hide grid and show single image with text
@@ -790,10 +806,10 @@ applyTextBtn.addEventListener('click', async () => {
         if (selectedImageItem) {
             const img = selectedImageItem.querySelector('img');
             if (img) {
-                img.src = data.image_base64;
+                img.src = data.image_url;
                 // Update data attribute
                 const imageData = JSON.parse(selectedImageItem.dataset.imageData);
-                imageData.image_base64 = data.image_base64;
+                imageData.image_url = data.image_url;
                 imageData.image_id = data.image_id;
                 selectedImageItem.dataset.imageData = JSON.stringify(imageData);
             }